@@ -1,8 +1,8 @@
 import os
-import json
 import nltk
 nltk.download('punkt_tab')
 from nltk.tokenize import sent_tokenize, word_tokenize
+from json_io import write_records
 
 def create_chunks_from_sentences(sentences, max_chunk_size, overlap_size):
     chunks = []
@@ -41,10 +41,9 @@ def create_chunks_from_sentences(sentences, max_chunk_size, overlap_size):
     return chunks
 
 
-def process_folder(input_folder, max_chunk_size, overlap_size, output_file):
-    all_chunks = {}  # Store chunks for each document
-
-    for filename in os.listdir(input_folder):
+# Function to yield chunk records one document at a time
+def iter_folder_chunks(input_folder, max_chunk_size, overlap_size):
+    for filename in sorted(os.listdir(input_folder)):
         if filename.endswith(".txt"):
             file_path = os.path.join(input_folder, filename)
             with open(file_path, "r", encoding="utf-8") as file:
@@ -55,16 +54,18 @@ def process_folder(input_folder, max_chunk_size, overlap_size, output_file):
 
             # Create chunks
             chunks = create_chunks_from_sentences(sentences, max_chunk_size, overlap_size)
-            all_chunks[filename] = chunks
+            for chunk in chunks:
+                yield {"file_name": filename, **chunk}
 
-    # Save chunks to a JSON file
-    with open(output_file, "w", encoding="utf-8") as json_file:
-        json.dump(all_chunks, json_file, indent=4)
+
+def process_folder(input_folder, max_chunk_size, overlap_size, output_file):
+    # Save chunks to a JSON Lines file, one chunk per line
+    write_records(output_file, iter_folder_chunks(input_folder, max_chunk_size, overlap_size))
 
 
 if __name__ == "__main__":
     input_folder = "input"  # Folder containing text files
-    output_file = "indexes/output_chunks.json"  # Output JSON file
+    output_file = "indexes/output_chunks.jsonl"  # Output JSON Lines file
     max_chunk_size = 600  # Maximum tokens per chunk
     overlap_size = 100    # Overlap size
 
@@ -2,6 +2,7 @@ import json
 from langchain.llms import Ollama
 from langchain.prompts import PromptTemplate
 from langchain.chains import LLMChain
+from json_io import iter_records, write_records
 
 # Configure Llama 3.2
 llm = Ollama(model="llama3.2")
@@ -35,39 +36,35 @@ def extract_entities_for_chunk(context):
 
     return entities_with_relations
 
-# Function to process all chunks in a JSON file
-def extract_entities_from_chunks(chunks_file, output_file):
-    with open(chunks_file, "r", encoding="utf-8") as f:
-        chunks_data = json.load(f)
-
-    extracted_data = {}
+# Function to yield extracted entities for each chunk as it is read
+def iter_chunk_entities(chunks_file):
+    for chunk in iter_records(chunks_file):
+        file_name = chunk["file_name"]
+        chunk_id = chunk["chunk_id"]
+        chunk_context = chunk["text"]
 
-    for file_name, chunks in chunks_data.items():
-        extracted_data[file_name] = []
-        for chunk in chunks:
-            chunk_id = chunk["chunk_id"]
-            chunk_context = chunk["text"]
+        print(f"Processing {file_name}: Chunk {chunk_id}...")
 
-            print(f"Processing {file_name}: Chunk {chunk_id}...")
+        # Extract entities for the chunk
+        entities_with_relations = extract_entities_for_chunk(chunk_context)
 
-            # Extract entities for the chunk
-            entities_with_relations = extract_entities_for_chunk(chunk_context)
+        # Yield the result with the file name and chunk ID
+        yield {
+            "file_name": file_name,
+            "chunk_id": chunk_id,
+            "entities": entities_with_relations
+        }
 
-            # Store the result with the chunk ID
-            extracted_data[file_name].append({
-                "chunk_id": chunk_id,
-                "entities": entities_with_relations
-            })
-
-    # Save the extracted entities to a JSON file
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(extracted_data, f, indent=4)
+# Function to process all chunks in a JSON Lines file
+def extract_entities_from_chunks(chunks_file, output_file):
+    # Save the extracted entities to a JSON Lines file, one chunk per line
+    write_records(output_file, iter_chunk_entities(chunks_file))
 
     print(f"Entity extraction completed. Results saved to {output_file}.")
 
 # Main execution
 if __name__ == "__main__":
-    chunks_file = "indexes/output_chunks.json"       # Input file with chunk texts
-    output_file = "indexes/extracted_entities.json" # Output file to save extracted entities
+    chunks_file = "indexes/output_chunks.jsonl"      # Input file with chunk texts
+    output_file = "indexes/extracted_entities.jsonl" # Output file to save extracted entities
 
     extract_entities_from_chunks(chunks_file, output_file)
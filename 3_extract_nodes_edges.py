@@ -1,7 +1,9 @@
-import json
 from langchain.llms import Ollama
 from langchain.prompts import PromptTemplate
 from langchain.chains import LLMChain
+import os
+from itertools import zip_longest
+from json_io import iter_records, write_records
 
 # Configure Llama 3.2
 llm = Ollama(model="llama3.2")
@@ -34,70 +36,75 @@ def extract_relationship(context, source, source_description, target, target_des
         return None
     return response.strip()
 
+# Function to yield edges for all chunks, collecting unique nodes along the way
+def iter_edges(entities_file, chunks_file, nodes):
+    # Both files hold one record per chunk in the same order, so they are read side by side
+    for chunk, chunk_text in zip_longest(iter_records(entities_file), iter_records(chunks_file)):
+        if chunk is None or chunk_text is None:
+            raise ValueError(f"{entities_file} and {chunks_file} have a different number of chunks")
+        file_name = chunk["file_name"]
+        chunk_id = chunk["chunk_id"]
+        if (chunk_text["file_name"], chunk_text["chunk_id"]) != (file_name, chunk_id):
+            raise ValueError(f"{entities_file} and {chunks_file} are out of step at {file_name}: Chunk {chunk_id}")
+        chunk_context = chunk_text["text"]
+
+        print(f"Processing {file_name}: Chunk {chunk_id}...")
+
+        for entity in chunk["entities"]:
+            source_name = entity["entity"]
+            source_description = entity["description"]
+
+            # Add source node
+            nodes.add((source_name, source_description))
+
+            # Process related entities
+            if "relations" in entity and entity["relations"]:
+                for target_name in entity["relations"]:
+                    # Get target description from entities in the chunk
+                    target_description = next(
+                        (e["description"] for e in chunk["entities"] if e["entity"] == target_name),
+                        "No description"
+                    )
+
+                    # Extract relationship using LLM
+                    relationship = extract_relationship(
+                        chunk_context, source_name, source_description, target_name, target_description
+                    )
+
+                    # Skip if no relationship is found
+                    if not relationship:
+                        continue
+
+                    # Add target node and edge
+                    nodes.add((target_name, target_description))
+                    yield (source_name, target_name, relationship)
+
 # Function to process entities and relationships for all chunks
 def process_entities_and_relationships(entities_file, chunks_file, output_nodes_file, output_edges_file):
-    # Load entities and chunk data
-    with open(entities_file, "r", encoding="utf-8") as f:
-        entities_data = json.load(f)
-
-    with open(chunks_file, "r", encoding="utf-8") as f:
-        chunks_data = json.load(f)
-
     nodes = set()  # Store unique nodes as (entity_name, description)
-    edges = []     # Store edges as (source, target, relationship)
-
-    for file_name, chunks in entities_data.items():
-        for chunk in chunks:
-            chunk_id = chunk["chunk_id"]
-            chunk_context = chunks_data[file_name][chunk_id]["text"]
-
-            print(f"Processing {file_name}: Chunk {chunk_id}...")
-
-            for entity in chunk["entities"]:
-                source_name = entity["entity"]
-                source_description = entity["description"]
-
-                # Add source node
-                nodes.add((source_name, source_description))
-
-                # Process related entities
-                if "relations" in entity and entity["relations"]:
-                    for target_name in entity["relations"]:
-                        # Get target description from entities in the chunk
-                        target_description = next(
-                            (e["description"] for e in chunk["entities"] if e["entity"] == target_name),
-                            "No description"
-                        )
-
-                        # Extract relationship using LLM
-                        relationship = extract_relationship(
-                            chunk_context, source_name, source_description, target_name, target_description
-                        )
 
-                        # Skip if no relationship is found
-                        if not relationship:
-                            continue
+    # Write both files next to the outputs and rename them into place only once both are complete,
+    # so a failed run leaves the previous nodes and edges untouched and in step
+    tmp_edges_file = f"{output_edges_file}.tmp"
+    tmp_nodes_file = f"{output_nodes_file}.tmp"
 
-                        # Add target node and edge
-                        nodes.add((target_name, target_description))
-                        edges.append((source_name, target_name, relationship))
+    # Save edges to JSON Lines as they are extracted, one (source, target, relationship) per line
+    write_records(tmp_edges_file, iter_edges(entities_file, chunks_file, nodes))
 
-    # Save nodes to JSON
-    with open(output_nodes_file, "w", encoding="utf-8") as f:
-        json.dump(list(nodes), f, indent=4)
+    # Save nodes to JSON Lines, one (entity_name, description) per line
+    write_records(tmp_nodes_file, list(nodes))
 
-    # Save edges to JSON
-    with open(output_edges_file, "w", encoding="utf-8") as f:
-        json.dump(edges, f, indent=4)
+    os.replace(tmp_edges_file, output_edges_file)
+    os.replace(tmp_nodes_file, output_nodes_file)
 
     print(f"Nodes saved to {output_nodes_file}")
     print(f"Edges saved to {output_edges_file}")
 
 # Main Execution
 if __name__ == "__main__":
-    entities_file = "indexes/extracted_entities.json"  # File with extracted entities and relations
-    chunks_file = "indexes/output_chunks.json"         # File with chunk texts
-    output_nodes_file = "indexes/nodes.json"           # Output file for nodes
-    output_edges_file = "indexes/edges.json"           # Output file for edges
+    entities_file = "indexes/extracted_entities.jsonl"  # File with extracted entities and relations
+    chunks_file = "indexes/output_chunks.jsonl"         # File with chunk texts
+    output_nodes_file = "indexes/nodes.jsonl"           # Output file for nodes
+    output_edges_file = "indexes/edges.jsonl"           # Output file for edges
 
     process_entities_and_relationships(entities_file, chunks_file, output_nodes_file, output_edges_file)
@@ -1,5 +1,5 @@
-import json
 from neo4j import GraphDatabase
+from json_io import iter_records
 
 # Neo4j Configuration
 NEO4J_URI = "bolt://localhost:7687"
@@ -8,19 +8,12 @@ NEO4J_PASSWORD = "password"
 
 # Function to add nodes and relationships to Neo4j
 def add_to_neo4j(nodes_file, edges_file):
-    # Load nodes and edges from JSON files
-    with open(nodes_file, "r", encoding="utf-8") as f:
-        nodes = json.load(f)
-
-    with open(edges_file, "r", encoding="utf-8") as f:
-        edges = json.load(f)
-
     driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USERNAME, NEO4J_PASSWORD))
 
     with driver.session() as session:
         # Add nodes in batch
         print("Adding nodes...")
-        for name, description in nodes:
+        for name, description in iter_records(nodes_file):
             session.run(
                 "MERGE (n:Entity {name: $name, description: $description})",
                 {"name": name, "description": description}
@@ -28,7 +21,7 @@ def add_to_neo4j(nodes_file, edges_file):
 
         # Add relationships in batch
         print("Adding relationships...")
-        for source, target, relationship in edges:
+        for source, target, relationship in iter_records(edges_file):
             session.run(
                 """
                 MATCH (a:Entity {name: $source_name}), (b:Entity {name: $target_name})
@@ -42,7 +35,7 @@ def add_to_neo4j(nodes_file, edges_file):
 
 # Main Execution
 if __name__ == "__main__":
-    nodes_file = "nodes.json"  # Input file for nodes
-    edges_file = "edges.json"  # Input file for edges
+    nodes_file = "indexes/nodes.jsonl"  # Input file for nodes
+    edges_file = "indexes/edges.jsonl"  # Input file for edges
 
     add_to_neo4j(nodes_file, edges_file)
@@ -1,7 +1,8 @@
-import json
+from itertools import groupby
 from langchain.llms import Ollama
 from langchain.prompts import PromptTemplate
 from langchain.chains import LLMChain
+from json_io import iter_records, dump_json
 
 # Configure Llama 3.2
 llm = Ollama(model="llama3.2")
@@ -39,12 +40,10 @@ def summarize_file(chunk_summaries):
 
 # Main function to summarize all files
 def summarize_all_files(input_file, output_file):
-    with open(input_file, "r", encoding="utf-8") as f:
-        chunks_data = json.load(f)
-
     file_summaries = {}
 
-    for file_name, chunks in chunks_data.items():
+    # Chunks of a file are stored consecutively, so they are streamed one file at a time
+    for file_name, chunks in groupby(iter_records(input_file), key=lambda chunk: chunk["file_name"]):
         print(f"Processing {file_name}...")
         chunk_summaries = []
 
@@ -60,14 +59,13 @@ def summarize_all_files(input_file, output_file):
         file_summaries[file_name] = file_summary
 
     # Save file summaries to JSON
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(file_summaries, f, indent=4)
+    dump_json(output_file, file_summaries)
 
     print(f"Summaries saved to {output_file}")
 
 # Main Execution
 if __name__ == "__main__":
-    input_file = "indexes/output_chunks.json"      # Input file with chunked text
+    input_file = "indexes/output_chunks.jsonl"     # Input file with chunked text
     output_file = "indexes/file_summaries.json"    # Output file for file-level summaries
 
     summarize_all_files(input_file, output_file)
@@ -1,5 +1,6 @@
-import json
 import requests
+from json_io import iter_records, write_records, load_json
+from quantization import NODE_VECTORS_FILE, VectorFileWriter, build_quantized_indexes
 
 # Embedding API URL
 API_URL = "http://localhost:11434/api/embeddings"
@@ -23,76 +24,79 @@ def generate_embedding_custom_api(text):
         print(f"Error generating embedding for text: {text[:30]}... -> {e}")
         return None
 
-# Function to process nodes, relationships, and summaries
-def generate_indexed_embeddings(nodes_file, summaries_file, output_file):
-    with open(nodes_file, "r", encoding="utf-8") as f:
-        nodes = json.load(f)
-
-    # with open(relationships_file, "r", encoding="utf-8") as f:
-    #     relationships = json.load(f)
-
-    with open(summaries_file, "r", encoding="utf-8") as f:
-        summaries = json.load(f)
-
-    indexed_embeddings = {
-        "nodes": [],
-        "relationships": [],
-        "summaries": []
-    }
-
+# Function to yield embedded nodes, relationships, and summaries as records
+def iter_indexed_embeddings(nodes_file, summaries_file, node_vectors=None):
     # Process nodes
     print("Processing nodes...")
-    for idx, (name, description) in enumerate(nodes):
+    for idx, (name, description) in enumerate(iter_records(nodes_file)):
         text = f"{name}: {description}"
         embedding = generate_embedding_custom_api(text)
         if embedding:
             print(f"{name}: embedded")
-            indexed_embeddings["nodes"].append({
+            if node_vectors is not None:
+                node_vectors.append(embedding)
+            yield {
+                "type": "node",
                 "id": f"node_{idx}",
                 "name": name,
                 "description": description,
                 "embedding": embedding
-            })
+            }
 
     # Process relationships
     # print("Processing relationships...")
-    # for idx, (source, target, relationship) in enumerate(relationships):
+    # for idx, (source, target, relationship) in enumerate(iter_records(relationships_file)):
     #     text = f"{source} -[{relationship}]-> {target}"
     #     embedding = generate_embedding_custom_api(text)
     #     if embedding:
-    #         indexed_embeddings["relationships"].append({
+    #         yield {
+    #             "type": "relationship",
     #             "id": f"relationship_{idx}",
     #             "source": source,
     #             "target": target,
     #             "relationship": relationship,
     #             "embedding": embedding
-    #         })
+    #         }
 
     # Process summaries
     print("Processing summaries...")
+    summaries = load_json(summaries_file)
     for idx, (file_name, summary) in enumerate(summaries.items()):
         embedding = generate_embedding_custom_api(summary)
         if embedding:
             print(f"{file_name}: embedded")
-            indexed_embeddings["summaries"].append({
+            yield {
+                "type": "summary",
                 "id": f"summary_{idx}",
                 "file_name": file_name,
                 "summary": summary,
                 "embedding": embedding
-            })
+            }
+
+# Function to process nodes, relationships, and summaries
+def generate_indexed_embeddings(nodes_file, summaries_file, output_file, quantization_methods=()):
+    # Node vectors are streamed to disk as they are embedded when quantized indexes are requested
+    node_vectors = VectorFileWriter(NODE_VECTORS_FILE) if quantization_methods else None
 
-    # Save indexed embeddings to JSON
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(indexed_embeddings, f, indent=4)
+    # Save indexed embeddings to JSON Lines as they are generated, one record per line
+    write_records(output_file, iter_indexed_embeddings(nodes_file, summaries_file, node_vectors))
 
     print(f"Indexed embeddings saved to {output_file}")
 
+    # Build optional quantized node indexes for compact search in query.py
+    if node_vectors is not None:
+        vectors = node_vectors.close()
+        print(f"Full-precision node vectors saved to {NODE_VECTORS_FILE}")
+        if len(vectors):
+            build_quantized_indexes(vectors, quantization_methods)
+
 # Main Execution
 if __name__ == "__main__":
     # File paths
-    nodes_file = "indexes/nodes.json"
-    # relationships_file = "edges.json"
+    nodes_file = "indexes/nodes.jsonl"
+    # relationships_file = "indexes/edges.jsonl"
     summaries_file = "indexes/file_summaries.json"
-    output_file = "indexes/indexed_embeddings.json"
+    output_file = "indexes/indexed_embeddings.jsonl"
+    quantization_methods = ["int8", "pq"]  # Quantized node indexes to build ([] to skip)
 
-    generate_indexed_embeddings(nodes_file, summaries_file, output_file)
+    generate_indexed_embeddings(nodes_file, summaries_file, output_file, quantization_methods)
@@ -1,14 +1,24 @@
 import gradio as gr
-import json
+import requests
 from query import query_pipeline
 
 # File paths
-EMBEDDINGS_FILE = "indexes/indexed_embeddings.json"
+EMBEDDINGS_FILE = "indexes/indexed_embeddings.jsonl"
 SUMMARIES_FILE = "indexes/file_summaries.json"
 
+# Set to the query_server.py address (e.g. "http://localhost:8000") to answer queries there
+QUERY_SERVER_URL = None
+QUERY_SERVER_TIMEOUT = 600  # Seconds to wait for an answer, as in load_test.py
+
 # Query pipeline function for Gradio
 def gradio_query_pipeline(query):
     try:
+        if QUERY_SERVER_URL:
+            # Forward the query to the multi-worker query server
+            response = requests.post(f"{QUERY_SERVER_URL}/query", json={"query": query}, timeout=QUERY_SERVER_TIMEOUT)
+            response.raise_for_status()
+            return response.json()["response"]
+
         # Call the query pipeline
         response = query_pipeline(query, EMBEDDINGS_FILE, SUMMARIES_FILE)
         return response
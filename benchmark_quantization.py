@@ -0,0 +1,90 @@
+import sys
+import time
+import resource
+import multiprocessing as mp
+import numpy as np
+from quantization import NODE_VECTORS_FILE, NODE_INDEX_FILES, normalize
+
+# Function to read the peak resident memory of the current process in MB
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10  # Bytes on macOS, KB elsewhere
+
+# Function to run one setup the way query.py deploys it, in a fresh process
+def run_setup(method, embeddings_file, queries, top_n, results):
+    try:
+        import query  # Imported here so its own memory is part of the baseline
+        query.NODE_INDEX = method
+        baseline = peak_rss_mb()
+
+        # Same loading and retrieval calls as query_pipeline and build_final_context
+        start = time.perf_counter()
+        embeddings = query.load_indexed_embeddings(embeddings_file, keep_node_embeddings=not method)
+        load_time = time.perf_counter() - start
+
+        found = []
+        start = time.perf_counter()
+        for q in queries:
+            if method:
+                similar_nodes = query.retrieve_similar_nodes_quantized(q, embeddings["nodes"], top_n)
+            else:
+                similar_nodes = query.retrieve_similar_embeddings(q, embeddings["nodes"], top_n)
+            found.append([node["id"] for node, _ in similar_nodes])
+        latency = (time.perf_counter() - start) / len(queries) * 1000
+
+        results.put((found, peak_rss_mb() - baseline, peak_rss_mb(), load_time, latency))
+    except Exception as e:
+        results.put(e)
+
+# Function to measure one setup in its own interpreter so runs do not share memory
+def measure(method, embeddings_file, queries, top_n):
+    ctx = mp.get_context("spawn")
+    results = ctx.Queue()
+    process = ctx.Process(target=run_setup, args=(method, embeddings_file, queries, top_n, results))
+    process.start()
+    result = results.get()
+    process.join()
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+# Function to compare the quantized setups against the full-precision path of query.py
+def benchmark(embeddings_file, num_queries, top_n, noise):
+    full_vectors = np.load(NODE_VECTORS_FILE, mmap_mode="r")
+    num_vectors, dim = full_vectors.shape
+
+    # Queries are perturbed node embeddings, so no embedding API is needed
+    rng = np.random.default_rng(0)
+    picks = np.sort(rng.choice(num_vectors, size=min(num_queries, num_vectors), replace=False))
+    queries = normalize(full_vectors[picks]) + noise * rng.standard_normal((len(picks), dim))
+
+    print(f"Nodes: {num_vectors}, Dimensions: {dim}, Queries: {len(queries)}, Top N: {top_n}")
+    print("Index RSS is the peak memory added by loading and searching, Peak RSS includes the interpreter")
+    print(f"{'Setup':<16}{'Index RSS (MB)':>16}{'Peak RSS (MB)':>15}{'Load (s)':>10}{'Recall@N':>10}{'Latency (ms)':>14}")
+
+    truth = None
+    for method in [None] + list(NODE_INDEX_FILES):
+        name = method or "full precision"
+        try:
+            found, index_rss, peak_rss, load_time, latency = measure(method, embeddings_file, queries, top_n)
+        except Exception as e:
+            print(f"{name:<16}failed: {e}")
+            if method is None:
+                return  # Recall needs the full-precision results
+            continue
+
+        # Recall is measured against the full-precision results
+        if truth is None:
+            truth = [set(ids) for ids in found]
+        hits = sum(len(expected & set(ids)) for expected, ids in zip(truth, found))
+        recall = hits / sum(len(expected) for expected in truth)
+        print(f"{name:<16}{index_rss:>16.1f}{peak_rss:>15.1f}{load_time:>10.2f}{recall:>10.3f}{latency:>14.3f}")
+
+# Main Execution
+if __name__ == "__main__":
+    embeddings_file = "indexes/indexed_embeddings.jsonl"
+    num_queries = 50    # Number of sample queries
+    top_n = 10          # Results per query
+    noise = 0.05        # Perturbation applied to sampled node embeddings
+
+    benchmark(embeddings_file, num_queries, top_n, noise)
@@ -0,0 +1,46 @@
+import json
+
+# Use orjson when installed, it is several times faster than the standard library
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Function to serialise an object to compact JSON bytes
+def dumps(obj):
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+# Function to parse JSON from bytes or str
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+# Function to iterate over the records of a JSON Lines file one line at a time
+def iter_records(path):
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                yield loads(line)
+
+# Function to write records from any iterable to a JSON Lines file as they are produced
+def write_records(path, records):
+    count = 0
+    with open(path, "wb") as f:
+        for record in records:
+            f.write(dumps(record))
+            f.write(b"\n")
+            count += 1
+    return count
+
+# Function to load a small JSON document in one go
+def load_json(path):
+    with open(path, "rb") as f:
+        return loads(f.read())
+
+# Function to save a small JSON document compactly
+def dump_json(path, obj):
+    with open(path, "wb") as f:
+        f.write(dumps(obj))
@@ -0,0 +1,67 @@
+import time
+import requests
+from concurrent.futures import ThreadPoolExecutor
+
+# Server Configuration
+SERVER_URL = "http://localhost:8000"
+
+# Function to wait until every server worker has warmed the index
+def wait_until_ready(server_url, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"{server_url}/ready", timeout=5).status_code == 200:
+                return
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(1)
+    raise TimeoutError(f"Query server at {server_url} was not ready after {timeout} seconds")
+
+# Function to send one query and measure its latency
+def timed_query(server_url, query):
+    start = time.perf_counter()
+    try:
+        response = requests.post(f"{server_url}/query", json={"query": query}, timeout=600)
+        ok = response.status_code == 200
+    except requests.exceptions.RequestException:
+        ok = False
+    return time.perf_counter() - start, ok
+
+# Function to return the given percentile of sorted latencies
+def percentile(sorted_latencies, pct):
+    if not sorted_latencies:
+        return 0.0
+    idx = min(len(sorted_latencies) - 1, int(round(pct / 100 * (len(sorted_latencies) - 1))))
+    return sorted_latencies[idx]
+
+# Function to generate load and report QPS and tail latency
+def run_load_test(server_url, queries, total_requests, concurrency):
+    wait_until_ready(server_url, timeout=300)
+    print(f"Sending {total_requests} requests with concurrency {concurrency}...")
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(
+            lambda i: timed_query(server_url, queries[i % len(queries)]),
+            range(total_requests)
+        ))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for latency, ok in results if ok)
+    errors = sum(1 for _, ok in results if not ok)
+    print(f"Completed: {len(latencies)}, Errors: {errors}, Time: {elapsed:.2f}s")
+    print(f"QPS: {len(latencies) / elapsed:.2f}")
+    for pct in (50, 90, 95, 99):
+        print(f"p{pct} latency: {percentile(latencies, pct) * 1000:.1f} ms")
+
+# Main Execution
+if __name__ == "__main__":
+    queries = [
+        "How does a pawn move?",
+        "Give me an overview of the documents.",
+        "What is the relationship between the king and the rook?",
+    ]
+    total_requests = 200   # Total requests to send
+    concurrency = 16       # Requests in flight at once
+
+    run_load_test(SERVER_URL, queries, total_requests, concurrency)
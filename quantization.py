@@ -0,0 +1,177 @@
+import os
+import shutil
+import numpy as np
+from sklearn.cluster import KMeans
+
+# Quantized node index files (rows follow the order of "nodes" in indexed_embeddings.json)
+NODE_VECTORS_FILE = "indexes/node_vectors.npy"
+NODE_INDEX_FILES = {
+    "int8": "indexes/node_index_int8.npz",
+    "pq": "indexes/node_index_pq.npz",
+}
+
+# Product quantization settings
+PQ_SUBSPACES = 48      # 768 dims -> 16 dims per subspace
+PQ_CENTROIDS = 256     # One uint8 code per subspace
+PQ_TRAIN_SIZE = 10000  # Rows sampled to train the codebooks (~39 per centroid), all rows are then encoded
+PQ_TRAIN_ITERATIONS = 25
+
+# How many candidates per requested result are re-ranked at full precision
+SHORTLIST_FACTOR = 10
+
+# Rows scored at a time, so the float32 temporaries of a query stay bounded
+SCORE_BLOCK_SIZE = 4096
+
+# Rows normalised and encoded at a time while building an index
+BUILD_BLOCK_SIZE = 4096
+
+# Function to L2-normalise rows so inner product equals cosine similarity
+def normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+# Writes full-precision vectors for on-demand re-ranking to disk as they arrive
+class VectorFileWriter:
+    def __init__(self, vectors_file):
+        self.vectors_file = vectors_file
+        self.rows_file = f"{vectors_file}.rows.tmp"
+        self.rows = open(self.rows_file, "wb")
+        self.count = 0
+        self.dim = None
+
+    def __len__(self):
+        return self.count
+
+    def append(self, embedding):
+        row = np.asarray(embedding, dtype=np.float32)
+        if self.dim is not None and row.shape != (self.dim,):
+            raise ValueError(f"Embedding of size {row.size} does not match earlier embeddings of size {self.dim}")
+        self.rows.write(row.tobytes())
+        self.dim = row.shape[0]
+        self.count += 1
+
+    # Function to turn the appended rows into a .npy file and memory-map it
+    def close(self):
+        self.rows.close()
+        header = {"descr": "<f4", "fortran_order": False, "shape": (self.count, self.dim or 0)}
+
+        # Rows are copied behind the .npy header in blocks, then renamed into place
+        tmp_file = f"{self.vectors_file}.tmp"
+        with open(tmp_file, "wb") as f, open(self.rows_file, "rb") as rows:
+            np.lib.format.write_array_header_1_0(f, header)
+            shutil.copyfileobj(rows, f, 1 << 24)
+        os.remove(self.rows_file)
+        os.replace(tmp_file, self.vectors_file)
+        return np.load(self.vectors_file, mmap_mode="r")
+
+# Function to build a scalar int8 index (one scale per dimension)
+def build_int8_index(vectors):
+    num_vectors, dim = vectors.shape
+
+    # First pass finds the per-dimension scale, second pass encodes, one block at a time
+    max_abs = np.zeros(dim, dtype=np.float32)
+    for start in range(0, num_vectors, BUILD_BLOCK_SIZE):
+        unit = normalize(vectors[start:start + BUILD_BLOCK_SIZE])
+        max_abs = np.maximum(max_abs, np.abs(unit).max(axis=0))
+    scale = max_abs / 127.0
+    scale[scale == 0] = 1.0
+
+    codes = np.empty((num_vectors, dim), dtype=np.int8)
+    for start in range(0, num_vectors, BUILD_BLOCK_SIZE):
+        unit = normalize(vectors[start:start + BUILD_BLOCK_SIZE])
+        codes[start:start + len(unit)] = np.clip(np.rint(unit / scale), -127, 127)
+    return {"codes": codes, "scale": scale}
+
+# Function to build a product quantization index (one codebook per subspace)
+def build_pq_index(vectors, num_subspaces=PQ_SUBSPACES, num_centroids=PQ_CENTROIDS, train_size=PQ_TRAIN_SIZE):
+    num_vectors, dim = vectors.shape
+    if dim % num_subspaces != 0:
+        raise ValueError(f"Embedding size {dim} is not divisible by {num_subspaces} subspaces")
+    sub_dim = dim // num_subspaces
+
+    # Train the codebooks on a bounded random sample so build time does not grow with the graph
+    rng = np.random.default_rng(0)
+    sample = np.sort(rng.choice(num_vectors, size=min(train_size, num_vectors), replace=False))
+    train = normalize(vectors[sample])
+    num_centroids = min(num_centroids, len(train))
+    models = [
+        KMeans(n_clusters=num_centroids, n_init=1, max_iter=PQ_TRAIN_ITERATIONS, random_state=0).fit(
+            train[:, m * sub_dim:(m + 1) * sub_dim]
+        )
+        for m in range(num_subspaces)
+    ]
+    codebooks = np.stack([model.cluster_centers_ for model in models]).astype(np.float32)
+
+    # Encode every row with the trained codebooks, one block at a time
+    codes = np.empty((num_vectors, num_subspaces), dtype=np.uint8)
+    for start in range(0, num_vectors, BUILD_BLOCK_SIZE):
+        unit = normalize(vectors[start:start + BUILD_BLOCK_SIZE])
+        for m, model in enumerate(models):
+            codes[start:start + len(unit), m] = model.predict(unit[:, m * sub_dim:(m + 1) * sub_dim])
+
+    return {"codes": codes, "codebooks": codebooks}
+
+# Function to build and save the requested quantized indexes
+def build_quantized_indexes(vectors, methods):
+    builders = {"int8": build_int8_index, "pq": build_pq_index}
+    for method in methods:
+        if method not in builders:
+            raise ValueError(f"Unknown quantization method: {method}")
+        print(f"Building {method} node index...")
+        index = builders[method](vectors)
+        np.savez(NODE_INDEX_FILES[method], method=method, **index)
+        print(f"{method} node index saved to {NODE_INDEX_FILES[method]}")
+
+# Function to load a quantized index and memory-map the full-precision vectors
+def load_quantized_index(method, num_vectors):
+    with np.load(NODE_INDEX_FILES[method]) as data:
+        index = {key: data[key] for key in data.files if key != "method"}
+    index["method"] = method
+    full_vectors = np.load(NODE_VECTORS_FILE, mmap_mode="r")
+
+    # A stale index would silently map results to the wrong nodes
+    if index["codes"].shape[0] != num_vectors or full_vectors.shape[0] != num_vectors:
+        raise ValueError(
+            f"{NODE_INDEX_FILES[method]} ({index['codes'].shape[0]} rows) and {NODE_VECTORS_FILE} "
+            f"({full_vectors.shape[0]} rows) do not match {num_vectors} nodes, rerun 6_create_embeddings.py"
+        )
+    return index, full_vectors
+
+# Function to score every node approximately from its compact codes
+def approximate_scores(query_embedding, index, block_size=SCORE_BLOCK_SIZE):
+    query = normalize(query_embedding)
+    codes = index["codes"]
+    scores = np.empty(len(codes), dtype=np.float32)
+
+    if index["method"] == "int8":
+        weights = query * index["scale"]
+        for start in range(0, len(codes), block_size):
+            block = codes[start:start + block_size]
+            scores[start:start + block_size] = block.astype(np.float32) @ weights
+        return scores
+
+    # Asymmetric distance: look up query/centroid products per subspace and sum them
+    codebooks = index["codebooks"]
+    num_subspaces, _, sub_dim = codebooks.shape
+    table = np.einsum("mkd,md->mk", codebooks, query.reshape(num_subspaces, sub_dim))
+    subspaces = np.arange(num_subspaces)
+    for start in range(0, len(codes), block_size):
+        block = codes[start:start + block_size]
+        scores[start:start + block_size] = table[subspaces, block].sum(axis=1)
+    return scores
+
+# Function to search the compact codes and re-rank the shortlist at full precision
+def search_quantized(query_embedding, index, full_vectors, top_n, shortlist_factor=SHORTLIST_FACTOR):
+    scores = approximate_scores(query_embedding, index)
+    shortlist_size = min(len(scores), max(top_n * shortlist_factor, top_n))
+    if shortlist_size <= 0:
+        return []
+    shortlist = np.argpartition(-scores, shortlist_size - 1)[:shortlist_size]
+    shortlist.sort()  # Sequential reads from the memory-mapped file
+
+    candidates = normalize(full_vectors[shortlist])
+    exact = candidates @ normalize(query_embedding)
+    order = np.argsort(-exact)[:top_n]
+    return [(int(shortlist[i]), float(exact[i])) for i in order]
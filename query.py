@@ -1,11 +1,13 @@
-import json
 import requests
+from contextlib import nullcontext
 from langchain.llms import Ollama
 from langchain.prompts import PromptTemplate
 from langchain.chains import LLMChain
 from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
 from neo4j import GraphDatabase
+from quantization import load_quantized_index, search_quantized, normalize
+from json_io import iter_records, load_json
 
 # API Configuration
 EMBEDDING_API_URL = "http://localhost:11434/api/embeddings"
@@ -13,10 +15,27 @@ NEO4J_URI = "bolt://localhost:7687"
 NEO4J_USERNAME = "neo4j"
 NEO4J_PASSWORD = "password"
 LLM_MODEL = "llama3.2"
+NODE_INDEX = None  # "int8" or "pq" to search quantized node codes, None for full precision
+NEO4J_MAX_SESSIONS = 16  # Neo4j connection pool size per process
 
-# Initialize LLM and Neo4j Driver
+# Initialize LLM; the Neo4j driver is created on first use so each server worker gets its own pool
 llm = Ollama(model=LLM_MODEL)
-driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USERNAME, NEO4J_PASSWORD))
+driver = None
+
+# Guards every LLM call; query_server.py replaces it with slots shared by all workers
+llm_slots = nullcontext()
+
+# Function to get the Neo4j driver of the current process
+def get_driver():
+    global driver
+    if driver is None:
+        driver = GraphDatabase.driver(
+            NEO4J_URI, auth=(NEO4J_USERNAME, NEO4J_PASSWORD), max_connection_pool_size=NEO4J_MAX_SESSIONS
+        )
+    return driver
+
+# Quantized node index, loaded once on first use
+node_index = None
 
 # Function to generate embedding for a query
 def generate_query_embedding(query):
@@ -47,7 +66,8 @@ def analyze_query(query):
         """
     )
     chain = LLMChain(llm=llm, prompt=prompt)
-    response = chain.run({"query": query}).replace("\n", "").strip()
+    with llm_slots:
+        response = chain.run({"query": query}).replace("\n", "").strip()
 
     # Normalize the response
     response = response.replace("Global:", ", Global:")
@@ -74,7 +94,7 @@ def analyze_query(query):
 
 # Function to retrieve relationships and descriptions for two nodes
 def retrieve_relationship_between_nodes(node1, node2):
-    with driver.session() as session:
+    with get_driver().session() as session:
         query = """
         MATCH (a:Entity {name: $node1})
         OPTIONAL MATCH (a)-[r]->(b:Entity {name: $node2})
@@ -110,9 +130,29 @@ def retrieve_similar_embeddings(query_embedding, embeddings, top_n):
     sorted_similarities = sorted(similarities, key=lambda x: x[1], reverse=True)[:top_n]
     return [(embeddings[idx], sim) for idx, sim in sorted_similarities]
 
+# Function to retrieve top N similar items from preloaded L2-normalised float32 vectors (e.g. memory-mapped)
+def retrieve_similar_vectors(query_embedding, items, vectors, top_n):
+    top_n = min(top_n, len(items))
+    if top_n <= 0:
+        return []
+    # Rows are already normalised, so cosine similarity is one float32 product without copying the matrix
+    similarities = vectors @ normalize(query_embedding)
+    top = np.argpartition(-similarities, top_n - 1)[:top_n]
+    top = top[np.argsort(-similarities[top])]
+    return [(items[idx], float(similarities[idx])) for idx in top]
+
+# Function to retrieve top N similar nodes from the quantized index with exact re-ranking
+def retrieve_similar_nodes_quantized(query_embedding, nodes, top_n):
+    global node_index
+    if node_index is None:
+        node_index = load_quantized_index(NODE_INDEX, len(nodes))
+    index, full_vectors = node_index
+    results = search_quantized(query_embedding, index, full_vectors, top_n)
+    return [(nodes[idx], sim) for idx, sim in results]
+
 # Function to retrieve node context from Neo4j
 def retrieve_node_context_from_neo4j(node_name):
-    with driver.session() as session:
+    with get_driver().session() as session:
         query = """
         MATCH (n:Entity {name: $name})
         OPTIONAL MATCH (n)-[r]->(m)
@@ -141,13 +181,21 @@ def build_final_context(query, embeddings, summaries):
     context = ""
 
     if local:
-        similar_nodes = retrieve_similar_embeddings(query_embedding, embeddings["nodes"], num_nodes)
+        if NODE_INDEX:
+            similar_nodes = retrieve_similar_nodes_quantized(query_embedding, embeddings["nodes"], num_nodes)
+        elif "node_vectors" in embeddings:
+            similar_nodes = retrieve_similar_vectors(query_embedding, embeddings["nodes"], embeddings["node_vectors"], num_nodes)
+        else:
+            similar_nodes = retrieve_similar_embeddings(query_embedding, embeddings["nodes"], num_nodes)
         for node, sim in similar_nodes:
             node_context = retrieve_node_context_from_neo4j(node["name"])
             context += f"Similarity: {sim:.2f}\n{node_context}\n"
 
     if global_:
-        similar_files = retrieve_similar_embeddings(query_embedding, embeddings["summaries"], num_files)
+        if "summary_vectors" in embeddings:
+            similar_files = retrieve_similar_vectors(query_embedding, embeddings["summaries"], embeddings["summary_vectors"], num_files)
+        else:
+            similar_files = retrieve_similar_embeddings(query_embedding, embeddings["summaries"], num_files)
         for file, sim in similar_files:
             context += f"Similarity: {sim:.2f}\nFile: {file['file_name']}\nSummary: {file['summary']}\n\n"
 
@@ -166,16 +214,29 @@ def get_response(query, context):
         """
     )
     chain = LLMChain(llm=llm, prompt=prompt)
-    return chain.run({"query": query, "context": context})
+    with llm_slots:
+        return chain.run({"query": query, "context": context})
 
-# Main function for query pipeline
-def query_pipeline(query, embeddings_file, summaries_file):
-    with open(embeddings_file, "r", encoding="utf-8") as f:
-        embeddings = json.load(f)
+# Group of indexed embeddings each record type belongs to
+RECORD_GROUPS = {"node": "nodes", "relationship": "relationships", "summary": "summaries"}
 
-    with open(summaries_file, "r", encoding="utf-8") as f:
-        summaries = json.load(f)
+# Function to load indexed embeddings from JSON Lines, grouped by record type
+def load_indexed_embeddings(embeddings_file, keep_node_embeddings=True):
+    embeddings = {
+        "nodes": [],
+        "relationships": [],
+        "summaries": []
+    }
+    for record in iter_records(embeddings_file):
+        group = RECORD_GROUPS[record.pop("type")]
+        # The quantized path only needs node metadata, its vectors live in the index files
+        if group == "nodes" and not keep_node_embeddings:
+            del record["embedding"]
+        embeddings[group].append(record)
+    return embeddings
 
+# Function to answer a query against already loaded embeddings and summaries
+def answer_query(query, embeddings, summaries):
     # Build final context
     context = build_final_context(query, embeddings, summaries)
 
@@ -183,10 +244,16 @@ def query_pipeline(query, embeddings_file, summaries_file):
     response = get_response(query, context)
     return response
 
+# Main function for query pipeline
+def query_pipeline(query, embeddings_file, summaries_file):
+    embeddings = load_indexed_embeddings(embeddings_file, keep_node_embeddings=not NODE_INDEX)
+    summaries = load_json(summaries_file)
+    return answer_query(query, embeddings, summaries)
+
 # Main execution
 if __name__ == "__main__":
     query = input("Enter your query: ")
-    embeddings_file = "indexes/indexed_embeddings.json"
+    embeddings_file = "indexes/indexed_embeddings.jsonl"
     summaries_file = "indexes/file_summaries.json"
 
     response = query_pipeline(query, embeddings_file, summaries_file)
@@ -0,0 +1,241 @@
+import gc
+import os
+import fcntl
+import shutil
+import tempfile
+import sys
+import time
+import signal
+import threading
+import traceback
+import multiprocessing as mp
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import numpy as np
+import query
+from json_io import iter_records, load_json, dumps, loads
+from quantization import load_quantized_index, normalize
+
+# Server Configuration
+HOST = "0.0.0.0"
+PORT = 8000
+NUM_WORKERS = os.cpu_count() or 1   # Pre-forked worker processes
+MAX_CONCURRENT_LLM_CALLS = 4        # Shared by all workers
+LLM_SLOT_POLL_INTERVAL = 0.05       # Seconds between attempts to take a free LLM slot
+RESTART_BACKOFF = 1.0               # Seconds before restarting a worker, doubled while it keeps failing
+RESTART_BACKOFF_MAX = 60.0
+SERVER_NODE_VECTORS_FILE = "indexes/server_node_vectors.npy"
+SERVER_SUMMARY_VECTORS_FILE = "indexes/server_summary_vectors.npy"
+
+# Function to save L2-normalised embedding vectors as a float32 .npy file and memory-map it back
+def save_and_map_vectors(vectors, vectors_file):
+    matrix = normalize(np.stack(vectors)) if vectors else np.zeros((0, 0), dtype=np.float32)
+
+    # Write a new file and rename it into place, so processes still mapping the old one are unaffected
+    tmp_file = f"{vectors_file}.{os.getpid()}.tmp"
+    with open(tmp_file, "wb") as f:
+        np.save(f, matrix)
+    os.replace(tmp_file, vectors_file)
+    return np.load(vectors_file, mmap_mode="r")
+
+# Function to load the index once so every worker shares a single read-only copy
+def load_shared_index(embeddings_file, summaries_file):
+    embeddings = {
+        "nodes": [],
+        "relationships": [],
+        "summaries": []
+    }
+    # In quantized mode node search reads the quantized index and indexes/node_vectors.npy instead
+    vectors = {"summaries": []} if query.NODE_INDEX else {"nodes": [], "summaries": []}
+
+    # Keep metadata in memory and move embeddings out into memory-mapped matrices
+    for record in iter_records(embeddings_file):
+        group = query.RECORD_GROUPS[record.pop("type")]
+        embedding = record.pop("embedding")
+        if group in vectors:
+            vectors[group].append(np.asarray(embedding, dtype=np.float32))
+        embeddings[group].append(record)
+
+    if "nodes" in vectors:
+        embeddings["node_vectors"] = save_and_map_vectors(vectors["nodes"], SERVER_NODE_VECTORS_FILE)
+    embeddings["summary_vectors"] = save_and_map_vectors(vectors["summaries"], SERVER_SUMMARY_VECTORS_FILE)
+
+    # Quantized codes are loaded before forking so workers share the parent's pages
+    if query.NODE_INDEX:
+        query.node_index = load_quantized_index(query.NODE_INDEX, len(embeddings["nodes"]))
+
+    summaries = load_json(summaries_file)
+    return embeddings, summaries
+
+# Function to pull the vectors searched on every query into the page cache and run one search
+def warm_index(embeddings):
+    np.asarray(embeddings["summary_vectors"]).sum()
+    if not embeddings["nodes"]:
+        return
+
+    if query.NODE_INDEX:
+        # One search scans all the codes; full-precision rows stay on disk until re-ranking reads them
+        _, full_vectors = query.node_index
+        query.retrieve_similar_nodes_quantized(np.asarray(full_vectors[0]), embeddings["nodes"], 1)
+    else:
+        node_vectors = embeddings["node_vectors"]
+        np.asarray(node_vectors).sum()
+        query.retrieve_similar_vectors(node_vectors[0], embeddings["nodes"], node_vectors, 1)
+
+# Cap on concurrent LLM calls across all workers. Each slot is a file locked with flock(), so taking
+# a slot and recording who holds it is one step, and the kernel frees the slots of a worker that dies
+class SharedLLMSlots:
+    def __init__(self, limit, lock_dir):
+        self.paths = [os.path.join(lock_dir, f"llm_slot_{i}.lock") for i in range(limit)]
+        for path in self.paths:
+            open(path, "a").close()
+        self.local = threading.local()  # Lock held by each request thread
+
+    def __enter__(self):
+        while True:
+            for path in self.paths:
+                # A separate open file per attempt, so threads of the same worker exclude each other too
+                fd = os.open(path, os.O_RDWR)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    os.close(fd)
+                    continue
+                self.local.fd = fd
+                return
+            time.sleep(LLM_SLOT_POLL_INTERVAL)
+
+    def __exit__(self, *exc_info):
+        fcntl.flock(self.local.fd, fcntl.LOCK_UN)
+        os.close(self.local.fd)
+
+# Request handler shared by all workers
+class QueryRequestHandler(BaseHTTPRequestHandler):
+    def send_json(self, status, payload):
+        body = dumps(payload)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != "/ready":
+            self.send_json(404, {"error": "Not found"})
+            return
+        ready_workers = sum(self.server.ready_flags)
+        status = 200 if ready_workers == len(self.server.ready_flags) else 503
+        self.send_json(status, {"ready": status == 200, "workers": ready_workers})
+
+    def do_POST(self):
+        if self.path != "/query":
+            self.send_json(404, {"error": "Not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            user_query = loads(self.rfile.read(length))["query"]
+        except (ValueError, KeyError, TypeError) as e:
+            self.send_json(400, {"error": f"Invalid request: {e}"})
+            return
+        try:
+            response = query.answer_query(user_query, self.server.embeddings, self.server.summaries)
+            self.send_json(200, {"response": response})
+        except Exception as e:
+            self.send_json(500, {"error": str(e)})
+
+    def log_message(self, format, *args):
+        pass
+
+# Function to run one pre-forked worker on the shared listening socket
+def run_worker(server, slot):
+    status = 0
+    try:
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        query.driver = None  # Each worker opens its own Neo4j connection pool
+        warm_index(server.embeddings)
+        server.ready_flags[slot] = 1
+        server.serve_forever()
+    except Exception:
+        print(f"Worker {os.getpid()} failed:", file=sys.stderr)
+        traceback.print_exc()
+        status = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(status)
+
+# Function to fork a worker into the given slot
+def spawn_worker(server, slot):
+    pid = os.fork()
+    if pid == 0:
+        run_worker(server, slot)
+    return pid
+
+# Main function for the query server
+def serve(embeddings_file, summaries_file, num_workers=NUM_WORKERS):
+    print("Loading index...")
+    embeddings, summaries = load_shared_index(embeddings_file, summaries_file)
+
+    # Created before forking so the limit applies across all workers
+    lock_dir = tempfile.mkdtemp(prefix="query_server_")
+    query.llm_slots = SharedLLMSlots(MAX_CONCURRENT_LLM_CALLS, lock_dir)
+
+    server = ThreadingHTTPServer((HOST, PORT), QueryRequestHandler)
+    server.daemon_threads = True
+    server.embeddings = embeddings
+    server.summaries = summaries
+    server.ready_flags = mp.Array("b", num_workers, lock=False)
+
+    # Move everything loaded so far out of the garbage collector's reach, so collections
+    # in the workers do not write to (and so copy) the shared pages
+    gc.freeze()
+
+    workers = {spawn_worker(server, slot): slot for slot in range(num_workers)}
+    print(f"Started {num_workers} workers on http://{HOST}:{PORT}, warming index...")
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    ready = False
+    failures = [0] * num_workers  # Consecutive exits before becoming ready, per slot
+    restarts = {}                 # Slot -> time its worker may be restarted
+    try:
+        while True:
+            # Report readiness once, after every worker has warmed the index
+            if not ready and all(server.ready_flags):
+                ready = True
+                print(f"Ready: {num_workers} workers serving http://{HOST}:{PORT}")
+
+            # Restart workers whose backoff has elapsed
+            now = time.monotonic()
+            for slot, restart_at in list(restarts.items()):
+                if now >= restart_at:
+                    del restarts[slot]
+                    workers[spawn_worker(server, slot)] = slot
+
+            # Replace any worker that exits
+            pid, status = os.waitpid(-1, os.WNOHANG) if workers else (0, 0)
+            slot = workers.pop(pid, None)
+            if slot is None:
+                time.sleep(0.5)
+                continue
+            failures[slot] = 0 if server.ready_flags[slot] else failures[slot] + 1
+            server.ready_flags[slot] = 0
+            delay = min(RESTART_BACKOFF * 2 ** failures[slot], RESTART_BACKOFF_MAX)
+            print(f"Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}, restarting in {delay:.0f}s")
+            restarts[slot] = time.monotonic() + delay
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print("Stopping workers...")
+        for pid in workers:
+            os.kill(pid, signal.SIGTERM)
+        for pid in workers:
+            os.waitpid(pid, 0)
+        server.server_close()
+        shutil.rmtree(lock_dir, ignore_errors=True)
+
+# Main Execution
+if __name__ == "__main__":
+    embeddings_file = "indexes/indexed_embeddings.jsonl"
+    summaries_file = "indexes/file_summaries.json"
+
+    serve(embeddings_file, summaries_file)